@@ -1,7 +1,129 @@
 import os
+import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import html # For unescaping HTML entities if needed in URLs, though typically not for filenames
 
+# Files to exclude from the sitemap
+# You can add more files to exclude if needed, e.g., "toc.html" if you don't want it indexed
+EXCLUDED = frozenset(("404.html", "print.html"))
+
+# Threads used to list directories concurrently while walking the book output
+SCAN_WORKERS = 8
+
+# Priority 1.0: Main landing pages
+TOP_PRIORITY_SUFFIXES = ("index.html", "home.html")
+TOP_PRIORITY = '    <priority>1.0</priority>\n'
+
+# Ordered (patterns, priority line) rules; the first rule with a pattern contained in the URL wins
+PRIORITY_RULES = (
+    # Priority 0.9: Effect Path API and Optics intro pages (key selling points)
+    (("effect/ch_intro.html", "effect/effect_path_overview.html",
+      "optics/optics_intro.html", "optics/focus_dsl.html",
+      "effect/focus_integration.html"), '    <priority>0.9</priority>\n'),
+    # Priority 0.8: Core documentation and tutorials intro
+    (("core-concepts.html", "usage-guide.html", "hkt_introduction.html",
+      "tutorials_intro.html", "spring_boot_integration.html"), '    <priority>0.8</priority>\n'),
+    # Priority 0.7: Other effect and optics pages
+    (("/effect/", "/optics/"), '    <priority>0.7</priority>\n'),
+    # Priority 0.6: Tutorial pages and examples
+    (("/tutorials/", "/hkts/"), '    <priority>0.6</priority>\n'),
+)
+DEFAULT_PRIORITY = '    <priority>0.5</priority>\n'
+
+XML_HEADER = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+              '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+XML_FOOTER = '</urlset>\n'
+
+# Only Windows needs relative paths converted to '/'-separated URL paths
+_NEEDS_SEP_FIX = os.path.sep != '/'
+
+# Characters html.escape would rewrite; lets the invariant base URL skip escaping entirely
+_NEEDS_ESCAPE = re.compile(r'[&<>"\']')
+
+# One <url> element; priority is a complete <priority> line from the rules above
+URL_TEMPLATE = (
+    "  <url>\n"
+    "    <loc>{loc}</loc>\n"
+    "    <lastmod>{lastmod}</lastmod>\n"
+    "    <changefreq>weekly</changefreq>\n" # Default change frequency
+    "{priority}"
+    "  </url>\n"
+)
+
+# All PRIORITY_RULES compiled into one regex. Each alternative is anchored at the start and
+# scans the whole URL, so alternatives are tried in rule order and the first matching rule
+# wins exactly as in PRIORITY_RULES (a plain alternation would pick the leftmost match instead).
+CLASSIFIER = re.compile("|".join(
+    f".*?(?P<rule{i}>{'|'.join(re.escape(p) for p in patterns)})"
+    for i, (patterns, _) in enumerate(PRIORITY_RULES)
+), re.DOTALL)
+GROUP_TO_PRIORITY = {f"rule{i}": priority for i, (_, priority) in enumerate(PRIORITY_RULES)}
+
+
+def _classify(url):
+    """Returns the sitemap <priority> line for a URL."""
+    if url.endswith(TOP_PRIORITY_SUFFIXES):
+        return TOP_PRIORITY
+    m = CLASSIFIER.match(url)
+    return GROUP_TO_PRIORITY[m.lastgroup] if m else DEFAULT_PRIORITY
+
+
+def _url_renderer(lastmod):
+    """
+    Specializes URL_TEMPLATE for one run.
+
+    lastmod is the same for every URL, so it is substituted into the template once up front;
+    the returned callable renders a <url> element from keyword arguments loc (already
+    escaped) and priority with a single format call.
+    """
+    return URL_TEMPLATE.replace("{lastmod}", lastmod).format
+
+
+def _scan_directory(pool, directory, rel_dir):
+    """
+    Lists one directory for _iter_html_files.
+
+    Returns (files, subdirs): the sitemap-eligible .html files as (path, relative_path) pairs
+    and one future per subdirectory, each already submitted to pool, all in name order.
+    rel_dir is the directory's path relative to the walk root, so a file's relative path is a
+    plain concatenation rather than an os.path.relpath call.
+    """
+    with os.scandir(directory) as it:
+        entries = sorted(it, key=lambda e: e.name)
+    files = []
+    subdirs = []
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            subdirs.append(pool.submit(_scan_directory, pool, entry.path, rel_dir + entry.name + os.sep))
+        elif entry.name.endswith(".html") and entry.name not in EXCLUDED and entry.is_file():
+            files.append((entry.path, rel_dir + entry.name))
+    return files, subdirs
+
+
+def _iter_html_files(root):
+    """
+    Yields (path, relative_path) for every sitemap-eligible .html file under root.
+
+    Directories are listed with os.scandir on a thread pool: each scan submits its
+    subdirectories as soon as it has listed them, so on slow (network/overlay) filesystems
+    the whole tree is read concurrently while the caller consumes results. os.scandir
+    releases the GIL, and DirEntry type information from readdir is reused instead of
+    being re-stat'ed.
+    Results are yielded top-down in name order, each directory's files before its
+    subdirectories, so the output is stable across runs and filesystems.
+    Unlike os.walk, a directory that cannot be listed is not skipped: the OSError from
+    os.scandir is raised to the caller, so an incomplete sitemap is never produced.
+    """
+    with ThreadPoolExecutor(max_workers=SCAN_WORKERS) as pool:
+        stack = [pool.submit(_scan_directory, pool, root, "")]
+        while stack:
+            files, subdirs = stack.pop().result()
+            yield from files
+            # Reversed so that subdirectories are popped, and therefore yielded, in name order
+            stack.extend(reversed(subdirs))
+
+
 def generate_sitemap(start_dir, base_url, output_file):
     """
     Generates a sitemap.xml by scanning for .html files in a directory.
@@ -14,77 +136,56 @@ def generate_sitemap(start_dir, base_url, output_file):
     if not base_url.endswith('/'):
         base_url += '/'
 
-    urls = []
-    # Files to exclude from the sitemap
-    excluded_files = ["404.html", "print.html"]
-    # You can add more files to exclude if needed, e.g., "toc.html" if you don't want it indexed
+    # Use a fixed date for lastmod or get it from file metadata if desired (more complex)
+    # Using current date for simplicity in this example
+    today = datetime.now().strftime('%Y-%m-%d')
+    render_url = _url_renderer(today)
+
+    # Escape special characters in URL
+    escaped_base = html.escape(base_url) if _NEEDS_ESCAPE.search(base_url) else base_url
+
+    # Ensure the output directory exists
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
 
-    for root, _, files in os.walk(start_dir):
-        for file in files:
-            if file.endswith(".html") and file not in excluded_files:
-                # Get relative path from start_dir
+    url_count = 0
+
+    # Stream each <url> element straight to the file as the walk finds it. Sitemap order has no
+    # meaning to crawlers, so there is no global sort; the walk visits directories and files
+    # in name order, which keeps the output stable between builds.
+    # The large buffer keeps the number of write() syscalls low.
+    # Elements are rendered from URL_TEMPLATE rather than with an XML library such as lxml or
+    # ElementTree: those would add a dependency or hold the whole tree in memory before writing.
+    # Write to a temporary file and move it into place once complete, so a failed walk
+    # never leaves a truncated sitemap.xml in the book output
+    tmp_file = output_file + '.tmp'
+    try:
+        with open(tmp_file, 'w', encoding='utf-8', buffering=1 << 20) as f:
+            f.write(XML_HEADER)
+            for _, relative_path in _iter_html_files(start_dir):
+                # relative_path is relative to start_dir
                 # e.g., if start_dir is "hkj-book/book" and file is "hkj-book/book/core-concepts.html",
                 # relative_path will be "core-concepts.html"
                 # if file is "hkj-book/book/subdir/page.html", relative_path will be "subdir/page.html"
-                relative_path = os.path.relpath(os.path.join(root, file), start_dir)
 
-                # Construct URL, ensuring no double slashes if relative_path is empty (for index.html at root)
-                # os.path.join won't work directly for URLs, so we build carefully
-                url_path_parts = relative_path.replace(os.path.sep, '/').split('/')
-                # Filter out any empty parts that might result from an index.html at the root of a subdir scan
-                # though os.path.relpath usually handles this well.
+                # Construct URL; os.path.join won't work directly for URLs, so we build carefully
                 # For sitemap, we want the actual .html file name
-
-                url = base_url + "/".join(url_path_parts)
+                url_path = relative_path.replace(os.path.sep, '/') if _NEEDS_SEP_FIX else relative_path
+                url = base_url + url_path
 
                 # Unescape HTML entities that might be in filenames if any (less common)
                 # url = html.unescape(url)
 
-                urls.append(url)
-
-    sitemap_content = '<?xml version="1.0" encoding="UTF-8"?>\n'
-    sitemap_content += '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
-
-    # Use a fixed date for lastmod or get it from file metadata if desired (more complex)
-    # Using current date for simplicity in this example
-    today = datetime.now().strftime('%Y-%m-%d')
-
-    for url in sorted(urls): # Sort URLs for consistent sitemap output
-        sitemap_content += '  <url>\n'
-        sitemap_content += f'    <loc>{html.escape(url)}</loc>\n' # Escape special characters in URL
-        sitemap_content += f'    <lastmod>{today}</lastmod>\n'
-        sitemap_content += '    <changefreq>weekly</changefreq>\n' # Default change frequency
-        # Determine priority based on page importance
-        # Priority 1.0: Main landing pages
-        if url.endswith("index.html") or url.endswith("home.html") or url == base_url.rstrip('/'):
-            sitemap_content += '    <priority>1.0</priority>\n'
-        # Priority 0.9: Effect Path API and Optics intro pages (key selling points)
-        elif any(p in url for p in ["effect/ch_intro.html", "effect/effect_path_overview.html",
-                                     "optics/optics_intro.html", "optics/focus_dsl.html",
-                                     "effect/focus_integration.html"]):
-            sitemap_content += '    <priority>0.9</priority>\n'
-        # Priority 0.8: Core documentation and tutorials intro
-        elif any(p in url for p in ["core-concepts.html", "usage-guide.html", "hkt_introduction.html",
-                                     "tutorials_intro.html", "spring_boot_integration.html"]):
-            sitemap_content += '    <priority>0.8</priority>\n'
-        # Priority 0.7: Other effect and optics pages
-        elif "/effect/" in url or "/optics/" in url:
-            sitemap_content += '    <priority>0.7</priority>\n'
-        # Priority 0.6: Tutorial pages and examples
-        elif "/tutorials/" in url or "/hkts/" in url:
-            sitemap_content += '    <priority>0.6</priority>\n'
-        else:
-            sitemap_content += '    <priority>0.5</priority>\n' # Default priority
-        sitemap_content += '  </url>\n'
-
-    sitemap_content += '</urlset>\n'
-
-    # Ensure the output directory exists
-    os.makedirs(os.path.dirname(output_file), exist_ok=True)
-
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(sitemap_content)
-    print(f"Sitemap generated at {output_file} with {len(urls)} URLs.")
+                # base_url is identical for every URL, so only the path needs escaping here
+                loc = escaped_base + html.escape(url_path)
+                f.write(render_url(loc=loc, priority=_classify(url))) # Priority based on page importance
+                url_count += 1
+            f.write(XML_FOOTER)
+    except BaseException:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
+    os.replace(tmp_file, output_file)
+    print(f"Sitemap generated at {output_file} with {url_count} URLs.")
 
 if __name__ == "__main__":
     # These values will be passed as environment variables in the GitHub Action
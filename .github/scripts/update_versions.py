@@ -8,16 +8,28 @@ documentation versions (both releases and latest snapshot).
 
 import json
 import argparse
+import os
+import re
 from pathlib import Path
 from datetime import datetime, timezone
 
+try:
+    # Optional C-implemented encoder; the standard library fallback produces the same bytes
+    import orjson
+
+    def _dumps(data: dict) -> bytes:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+except ImportError:
+    def _dumps(data: dict) -> bytes:
+        return json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+
 
 def load_versions(repo_dir: Path) -> dict:
     """Load existing versions.json or create new structure."""
     versions_file = repo_dir / "versions.json"
 
     if versions_file.exists():
-        with open(versions_file, 'r') as f:
+        with open(versions_file, 'r', encoding='utf-8') as f:
             return json.load(f)
 
     # Default structure
@@ -33,29 +45,56 @@ def load_versions(repo_dir: Path) -> dict:
     }
 
 
-def parse_version(version_string: str) -> tuple:
+# major[.minor[.patch]] with an optional 'v' prefix, an optional '-pre.release' suffix and
+# optional '+build' metadata (semantic versioning). Any further dotted parts after the patch
+# number (e.g. '0.1.9.RELEASE') are ignored, as the original split-based parser did.
+_VERSION_RE = re.compile(
+    r'^v?(\d+)(?:\.(\d+)(?:\.(\d+)(?:\.[0-9A-Za-z-]+)*)?)?'
+    r'(?:-([0-9A-Za-z-]+(?:\.[0-9A-Za-z-]+)*))?'
+    r'(?:\+[0-9A-Za-z-]+(?:\.[0-9A-Za-z-]+)*)?$'
+)
+
+# Pre-release key for a final release; sorts above every pre-release key (which start with 0)
+_RELEASE = (1,)
+
+
+def _prerelease_key(prerelease: str) -> tuple:
     """
-    Parse a version string into a tuple of integers for proper sorting.
-    Handles formats like 'v0.1.9', 'v0.1.10', etc.
+    Build a sort key for a pre-release suffix such as 'rc.1' or 'beta2'.
 
-    Returns a tuple of (major, minor, patch) as integers.
-    Falls back to string comparison if parsing fails.
+    Identifiers compare left to right; numeric identifiers compare numerically
+    and sort before alphanumeric ones, as in semantic versioning.
     """
-    try:
-        # Remove 'v' prefix and split on '.'
-        parts = version_string.lstrip('v').split('.')
-        # Convert to integers, handling up to 3 parts (major.minor.patch)
-        return tuple(int(p) for p in parts[:3])
-    except (ValueError, AttributeError):
+    return (0,) + tuple(
+        (0, int(part), "") if part.isdigit() else (1, 0, part)
+        for part in prerelease.split('.')
+    )
+
+
+def parse_version(version_string: str) -> tuple:
+    """
+    Parse a version string into a tuple for proper sorting.
+    Handles formats like 'v0.1.9', 'v0.1.10', 'v0.2.0-rc.1', 'v0.2.0+build5', etc.
+
+    Returns a tuple of (major, minor, patch, pre-release key), with missing
+    minor/patch parts treated as 0. Dotted parts after the patch number,
+    such as the '.RELEASE' in '0.1.9.RELEASE', are ignored. A pre-release
+    sorts before the release it precedes, and build metadata is ignored.
+    Falls back to (0, 0, 0, ()) if parsing fails.
+    """
+    m = _VERSION_RE.match(version_string)
+    if m is None:
         # Fallback for unparseable versions.
-        return (0, 0, 0)  # Will be sorted as the oldest version.
+        return (0, 0, 0, ())  # Will be sorted as the oldest version.
+    prerelease = _prerelease_key(m[4]) if m[4] else _RELEASE
+    return (int(m[1]), int(m[2] or 0), int(m[3] or 0), prerelease)
 
 
 def update_versions_file(repo_dir: Path, version: str, version_label: str):
     """Update versions.json with new version information."""
 
     data = load_versions(repo_dir)
-    current_time = datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
+    current_time = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
 
     if version == "latest":
         # Update latest snapshot
@@ -70,23 +109,31 @@ def update_versions_file(repo_dir: Path, version: str, version_label: str):
             "releaseDate": current_time
         }
 
-        # Remove existing entry if present (for re-deployments)
-        data["versions"] = [v for v in data["versions"] if v["version"] != version]
-
-        # Add new entry
-        data["versions"].append(version_entry)
+        # Index entries by version so adding or replacing one (for re-deployments) is a
+        # single dict assignment rather than a filtered copy of the whole list
+        versions_map = {v["version"]: v for v in data["versions"]}
+        versions_map[version] = version_entry
 
         # Sort versions in reverse order (newest first) using semantic versioning
-        data["versions"].sort(key=lambda v: parse_version(v["version"]), reverse=True)
-
-        # Update stable pointer to latest version
-        if data["versions"]:
-            data["stable"] = data["versions"][0]["version"]
-
-    # Write updated versions.json
+        # sorted evaluates the key once per entry and sorts on the cached keys,
+        # so parse_version runs exactly once per version, not once per comparison.
+        data["versions"] = sorted(versions_map.values(),
+                                  key=lambda v: parse_version(v["version"]), reverse=True)
+
+        # Update stable pointer to latest final release. Pre-releases are never made
+        # stable, so the pointer is left alone if only pre-releases are present.
+        stable = next((v["version"] for v in data["versions"]
+                       if parse_version(v["version"])[3] == _RELEASE), None)
+        if stable is not None:
+            data["stable"] = stable
+
+    # Write updated versions.json in a single write to a temporary file, then move it
+    # into place so a concurrent reader never sees a half-written file
     versions_file = repo_dir / "versions.json"
-    with open(versions_file, 'w') as f:
-        json.dump(data, f, indent=2)
+    tmp_file = versions_file.with_suffix('.json.tmp')
+    with open(tmp_file, 'wb') as f:
+        f.write(_dumps(data))
+    os.replace(tmp_file, versions_file)
 
     print(f"Updated versions.json with version: {version}")
     print(f"Current stable version: {data['stable']}")